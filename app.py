@@ -1,72 +1,137 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
-from pathlib import Path
+from flask import Flask, render_template, stream_template, request, redirect, url_for, session, flash, jsonify
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import logging
+import threading
+import time
 import pandas as pd
 import numpy as np
 import os
-import sys
-from sklearn.metrics.pairwise import cosine_similarity
-from gemini_client import gemini_generate_content
-from book_collaborative_filtering import (
-    load_book_data, filter_active, build_sparse_user_book_matrix,
-    get_book_recommendations_sparse, get_top_books, find_matching_book
-)
-
-app = Flask(__name__)
-app.secret_key = '32'  
-
-# Load movie data once at startup with memory-efficient dtypes
-movies_df = pd.read_csv(
-    'movies_cleaned.csv',
-    dtype={'movieId': 'int32', 'title': 'str', 'genres': 'str'}
-)
-
-# Check if ratings_cleaned.csv exists, if not, try to download it
-if not os.path.exists('ratings_cleaned.csv'):
-    print("⚠️  ratings_cleaned.csv not found. Attempting to download from Google Drive...")
+from gemini_client import gemini_generate_content, gemini_generate_json, EXPLANATION_UNAVAILABLE
+from id_encoding import encode, encode_movie_data
+from genre_bitmask import build_genre_vocab, pack_genres, unpack_genres, cosine_scores
+from cross_domain_candidates import load_or_build_candidate_table, index_candidate_table, lookup_candidate_books
+
+# Expected shape of the batched explanation response: one object per numbered pair
+PAIR_EXPLANATIONS_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "id": {"type": "INTEGER"},
+            "explanation": {"type": "STRING"}
+        },
+        "required": ["id", "explanation"]
+    }
+}
+
+# Datasets and models loaded by the background warm-up, plus readiness bookkeeping
+class WarmupState:
+    def __init__(self):
+        self.ready = threading.Event()
+        self.error = None
+        self.timings = {}
+        self.data = {}
+
+# Load movie data with memory-efficient dtypes; genres are kept as one uint32 bitmask per
+# movie (bit i = genre_vocab[i]) instead of one int64 column per genre
+def load_movies(path='movies_cleaned.csv'):
+    movies_df = pd.read_csv(
+        path,
+        usecols=['movieId', 'title', 'genres'],
+        dtype={'movieId': 'int32', 'title': 'str', 'genres': 'str'}
+    )
+    movies_df, _, movie_vocab = encode_movie_data(movies_df)
+    genre_vocab = build_genre_vocab(movies_df['genres'])
+    movies_df['genre_mask'] = pack_genres(movies_df['genres'], genre_vocab)
+    return movies_df, movie_vocab, genre_vocab
+
+# Load movie ratings, fetching ratings_cleaned.csv first if it is missing
+def load_ratings(path='ratings_cleaned.csv'):
+    if not os.path.exists(path):
+        print(f"⚠️  {path} not found. Attempting to download it...")
+        from download_large_files import fetch_file
+        fetch_file(os.path.basename(path), dest_dir=os.path.dirname(path) or '.')
+    return pd.read_csv(
+        path,
+        dtype={'userId': 'int32', 'movieId': 'int32', 'rating': 'float32', 'timestamp': 'str'},
+        low_memory=True
+    )
+
+# Load book data (the collaborative filtering module pulls in scipy, so import it here)
+def load_books():
+    from book_collaborative_filtering import load_book_data, get_top_books
+    # get_top_books is handed to request handlers through state.data, so they never import at request time
+    return (*load_book_data(return_vocabs=True), get_top_books)
+
+# Build the collaborative filtering matrix from active users and popular books
+def build_book_matrix(book_ratings_df):
+    from book_collaborative_filtering import filter_active, build_sparse_user_book_matrix
+    filtered_book_ratings = filter_active(book_ratings_df, min_user_ratings=10, min_book_ratings=10)
+    return build_sparse_user_book_matrix(filtered_book_ratings)
+
+# Precomputed movie genres -> ranked book candidates for cross-domain pairing
+def load_candidates(movies_df, books_df, book_stats, isbn_vocab):
+    candidate_table = load_or_build_candidate_table(movies_df, books_df, book_stats, min_ratings=50)
+    return index_candidate_table(candidate_table, books_df, book_stats, isbn_vocab)
+
+def _timed(state, logger, name, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    state.timings[name] = round(time.perf_counter() - start, 3)
+    logger.info("Warm-up: %s loaded in %.2fs", name, state.timings[name])
+    return result
+
+# Load everything the routes need. Independent loads (movies, movie ratings, books) run in
+# parallel threads; the book matrix and candidate table start as soon as their inputs are ready.
+def warm_up(state, logger):
+    start = time.perf_counter()
     try:
-        import gdown
-        url = "https://drive.google.com/uc?id=19RYqakQfY0dazo8uuNHxHFRgIVme7kKE"
-        gdown.download(url, 'ratings_cleaned.csv', quiet=False)
-        if not os.path.exists('ratings_cleaned.csv'):
-            raise Exception("Failed to download ratings_cleaned.csv")
-        print("✅ Successfully downloaded ratings_cleaned.csv")
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            movies_future = executor.submit(_timed, state, logger, 'movies', load_movies)
+            ratings_future = executor.submit(_timed, state, logger, 'ratings', load_ratings)
+            books_future = executor.submit(_timed, state, logger, 'books', load_books)
+            movies_df, movie_vocab, genre_vocab = movies_future.result()
+            books_df, book_ratings_df, book_stats, book_user_vocab, isbn_vocab, get_top_books = books_future.result()
+            matrix_future = executor.submit(_timed, state, logger, 'book_matrix', build_book_matrix, book_ratings_df)
+            candidates_future = executor.submit(_timed, state, logger, 'candidates', load_candidates, movies_df, books_df, book_stats, isbn_vocab)
+            ratings_df = ratings_future.result()
+            book_matrix, user_id_to_idx, book_isbn_to_idx, book_user_ids, book_isbns = matrix_future.result()
+            genre_candidates, candidate_book_records = candidates_future.result()
     except Exception as e:
-        print(f"❌ Error downloading ratings_cleaned.csv: {e}")
-        print("Please run 'python download_large_files.py' to download required files.")
-        sys.exit(1)
-
-ratings_df = pd.read_csv(
-    'ratings_cleaned.csv',
-    dtype={'userId': 'int32', 'movieId': 'int32', 'rating': 'float32', 'timestamp': 'str'},
-    low_memory=True
-)
-
-# Load book data and collaborative filtering model
-books_df, book_ratings_df, book_stats = load_book_data()
-filtered_book_ratings = filter_active(book_ratings_df, min_user_ratings=10, min_book_ratings=10)
-book_matrix, user_id_to_idx, book_isbn_to_idx, book_user_ids, book_isbns = build_sparse_user_book_matrix(filtered_book_ratings)
-
-# Helper functions for movies (unchanged)
-def get_genre_columns(movies_df):
-    base_cols = {'movieId', 'title', 'genres'}
-    genre_columns = [col for col in movies_df.columns if col not in base_cols]
-    return genre_columns
-
-def build_user_profile(ratings_df, movies_df, user_id, genre_columns, min_rating=4.0):
+        state.error = str(e)
+        logger.exception("Warm-up failed")
+        return
+    state.data.update(
+        movies_df=movies_df, movie_vocab=movie_vocab, genre_vocab=genre_vocab, ratings_df=ratings_df,
+        books_df=books_df, book_ratings_df=book_ratings_df, book_stats=book_stats,
+        book_user_vocab=book_user_vocab, isbn_vocab=isbn_vocab, get_top_books=get_top_books,
+        book_matrix=book_matrix, user_id_to_idx=user_id_to_idx, book_isbn_to_idx=book_isbn_to_idx,
+        book_user_ids=book_user_ids, book_isbns=book_isbns,
+        genre_candidates=genre_candidates, candidate_book_records=candidate_book_records,
+    )
+    state.timings['total'] = round(time.perf_counter() - start, 3)
+    logger.info("Warm-up complete in %.2fs", state.timings['total'])
+    state.ready.set()
+
+# Helper functions for movies (genre profiles and scoring use the packed genre_mask)
+def build_user_profile(ratings_df, movies_df, user_id, genre_vocab, movie_vocab, min_rating=4.0):
     user_rated = ratings_df[(ratings_df['userId'] == user_id) & (ratings_df['rating'] >= min_rating)]
-    user_movies = pd.merge(user_rated, movies_df, on='movieId')
+    liked_codes = encode(user_rated['movieId'], movie_vocab)
+    user_movies = movies_df[np.isin(movies_df['movie_idx'].to_numpy(), liked_codes)]
     if user_movies.empty:
-        return np.zeros(len(genre_columns))
-    user_profile = user_movies[genre_columns].mean().values
+        return np.zeros(len(genre_vocab))
+    user_profile = unpack_genres(user_movies['genre_mask'].to_numpy(), genre_vocab).mean(axis=0)
     return user_profile
 
-def recommend_movies(user_profile, movies_df, genre_columns, n=10, seen_movie_ids=None):
+def recommend_movies(user_profile, movies_df, genre_vocab, movie_vocab, n=10, seen_movie_ids=None):
     if seen_movie_ids is None:
         seen_movie_ids = set()
-    similarities = cosine_similarity([user_profile], movies_df[genre_columns].values)[0]
+    similarities = cosine_scores(user_profile, movies_df['genre_mask'].to_numpy())[0]
     movies_df = movies_df.copy()
     movies_df['similarity'] = similarities
-    recs = movies_df[~movies_df['movieId'].isin(seen_movie_ids)].sort_values('similarity', ascending=False)
+    seen_codes = encode(pd.Index(list(seen_movie_ids)), movie_vocab)
+    unseen = ~np.isin(movies_df['movie_idx'].to_numpy(), seen_codes)
+    recs = movies_df[unseen].sort_values('similarity', ascending=False)
     return recs[['movieId', 'title', 'genres', 'similarity']].head(n)
 
 def get_cold_start_recommendations(movies_df, ratings_df, min_ratings=1000, n=10):
@@ -78,154 +143,265 @@ def get_cold_start_recommendations(movies_df, ratings_df, min_ratings=1000, n=10
     top_movies = top_movies.sort_values('avg_rating', ascending=False)
     return top_movies[['movieId', 'title', 'genres', 'avg_rating', 'num_ratings']].head(n)
 
-def explain_movie_book_pair(user_profile, movie_row, book_row, genre_columns):
-    # Only include genres that exist in the movie_row
-    genres = ', '.join([g for g in genre_columns if g in movie_row and movie_row[g] == 1])
+def explain_movie_book_pair(user_profile, movie_row, book_row, genre_vocab):
+    genres = ', '.join(_pair_genres(movie_row))
     book_title = book_row.get('Book-Title', '')
     book_author = book_row.get('Book-Author', '')
     prompt = (
         f"Explain in English why this movie and book are recommended together. "
-        f"User's genre preferences (0-1 scale): {dict(zip(genre_columns, user_profile.round(2)))}. "
+        f"User's genre preferences (0-1 scale): {dict(zip(genre_vocab, user_profile.round(2)))}. "
         f"Movie: {movie_row['title']} (Genres: {genres}). "
         f"Book: {book_title} by {book_author}. "
         f"Be concise and friendly."
     )
     return gemini_generate_content(prompt)
 
-# Helper: get books already rated by user
+def _pair_genres(movie_row):
+    return movie_row['genres'].split('|') if isinstance(movie_row['genres'], str) else []
+
+# Per-pair mode: one prompt (and one API call) for each movie/books pair
+def explain_pairs(user_profile, genre_vocab, movie_book_pairs, usage=None):
+    explanations = []
+    for pair in movie_book_pairs:
+        movie_row = pair['movie']
+        book_titles = [b['Book-Title'] for b in pair['books']]
+        prompt = (
+            "You are a helpful recommender system. Provide a brief, friendly, and well-structured explanation in Markdown (2-3 bullet points max) for why this movie and these books are recommended together. "
+            "Use bullet points for each reason.\n"
+            f"User's genre preferences: {dict(zip(genre_vocab, user_profile.round(2)))}. "
+            f"Movie: {movie_row['title']} (Genres: {', '.join(_pair_genres(movie_row))}). "
+            f"Books: {book_titles}. "
+            "Focus on genre, themes, and what the user might enjoy."
+        )
+        explanations.append(gemini_generate_content(prompt, usage=usage))
+    return explanations
+
+# Validate a batched response; pairs with a missing or malformed entry get the fallback text
+def parse_batched_explanations(response, n_pairs):
+    explanations = [None] * n_pairs
+    if isinstance(response, list):
+        for item in response:
+            if not isinstance(item, dict):
+                continue
+            pair_id, text = item.get('id'), item.get('explanation')
+            if isinstance(pair_id, bool) or not isinstance(pair_id, int) or not 1 <= pair_id <= n_pairs:
+                continue
+            if not isinstance(text, str) or not text.strip() or explanations[pair_id - 1] is not None:
+                continue
+            explanations[pair_id - 1] = text.strip()
+    return [text if text is not None else EXPLANATION_UNAVAILABLE for text in explanations]
+
+# Batched mode: a single prompt listing every pair on the page, answered as a JSON array
+def explain_pairs_batched(user_profile, genre_vocab, movie_book_pairs, usage=None, max_tokens_per_pair=200):
+    if not movie_book_pairs:
+        return []
+    pair_lines = '\n'.join(
+        f"{i}. Movie: {pair['movie']['title']} (Genres: {', '.join(_pair_genres(pair['movie']))}). "
+        f"Books: {[b['Book-Title'] for b in pair['books']]}."
+        for i, pair in enumerate(movie_book_pairs, start=1)
+    )
+    prompt = (
+        "You are a helpful recommender system. For each numbered pair below, provide a brief, friendly, and well-structured explanation in Markdown (2-3 bullet points max) for why the movie and the books are recommended together. "
+        "Use bullet points for each reason. Focus on genre, themes, and what the user might enjoy.\n"
+        f"User's genre preferences: {dict(zip(genre_vocab, user_profile.round(2)))}.\n"
+        f"{pair_lines}\n"
+        'Respond with a JSON array containing one object per pair: {"id": <pair number>, "explanation": <Markdown text>}.'
+    )
+    response = gemini_generate_json(prompt, PAIR_EXPLANATIONS_SCHEMA, max_tokens=max_tokens_per_pair * len(movie_book_pairs), usage=usage)
+    return parse_batched_explanations(response, len(movie_book_pairs))
+
+# Yield (pair index, explanation) as explanations complete, then log the page's usage.
+# Per-pair prompts run concurrently and are yielded in completion order.
+def stream_explanations(mode, user_profile, genre_vocab, movie_book_pairs, logger):
+    start = time.perf_counter()
+    usages = []
+    if mode == 'batched':
+        usage = {}
+        usages.append(usage)
+        yield from enumerate(explain_pairs_batched(user_profile, genre_vocab, movie_book_pairs, usage=usage))
+    elif movie_book_pairs:
+        with ThreadPoolExecutor(max_workers=len(movie_book_pairs)) as executor:
+            futures = {}
+            for i, pair in enumerate(movie_book_pairs):
+                usage = {}
+                usages.append(usage)
+                futures[executor.submit(explain_pairs, user_profile, genre_vocab, [pair], usage)] = i
+            for future in as_completed(futures):
+                yield futures[future], future.result()[0]
+    logger.info(
+        "Explanations (%s): %d call(s), %d prompt + %d output tokens, %.2fs",
+        mode, sum(u.get('calls', 0) for u in usages), sum(u.get('prompt_tokens', 0) for u in usages),
+        sum(u.get('output_tokens', 0) for u in usages), time.perf_counter() - start
+    )
+
+# Helper: get integer codes (isbn_idx) of books already rated by user
 def get_rated_books(user_id, book_ratings_df):
-    return set(book_ratings_df[book_ratings_df['User-ID'] == user_id]['ISBN'])
-
-# Recommend top N unique books by genre, excluding already rated and already recommended in this batch
-def find_matching_books(movie_genres, books_df, book_stats, rated_books, already_recommended, min_ratings=50, n=3):
-    matches = pd.DataFrame()
-    for genre in movie_genres:
-        genre_matches = books_df[books_df['Book-Title'].str.contains(genre, case=False, na=False)]
-        matches = pd.concat([matches, genre_matches])
-    if not matches.empty and 'num_ratings' in matches.columns:
-        matches = pd.merge(matches, book_stats, on='ISBN', suffixes=('', '_stats'))
-        if 'num_ratings' in matches.columns:
-            matches = matches[matches['num_ratings'] >= min_ratings]
-        matches = matches[~matches['ISBN'].isin(rated_books | already_recommended)]
-        if not matches.empty:
-            return matches.sort_values('avg_rating', ascending=False).head(n).to_dict('records')
+    return set(book_ratings_df.loc[book_ratings_df['User-ID'] == user_id, 'isbn_idx'].tolist())
+
+# Recommend top N unique books by genre, excluding already rated and already recommended in this batch.
+# Candidates per genre combination are precomputed (see cross_domain_candidates.py), so this is a lookup.
+def find_matching_books(movie_genres, books_df, book_stats, genre_candidates, candidate_book_records, rated_books, already_recommended, get_top_books, min_ratings=50, n=3):
+    excluded = rated_books | already_recommended
+    matches = lookup_candidate_books(movie_genres, genre_candidates, candidate_book_records, excluded, n=n)
+    if matches:
+        return matches
     # Fallback: top-rated books not yet rated or recommended
-    top_books = get_top_books(book_stats, books_df, min_ratings=min_ratings, n=n+len(rated_books|already_recommended))
-    top_books = [b for b in top_books if b['ISBN'] not in rated_books and b['ISBN'] not in already_recommended][:n]
+    top_books = get_top_books(book_stats, books_df, min_ratings=min_ratings, n=n+len(excluded))
+    top_books = [b for b in top_books if b['isbn_idx'] not in excluded][:n]
     return top_books
 
-@app.route('/', methods=['GET', 'POST'])
-def home():
-    if request.method == 'POST':
-        user_id = int(request.form['user_id'])
-        session['user_id'] = user_id
-        return redirect(url_for('recommend'))
-    return render_template('home.html')
-
-@app.route('/recommend', methods=['GET', 'POST'])
-def recommend():
-    user_id = session.get('user_id', None)
-    if user_id is None:
-        return redirect(url_for('home'))
-    global ratings_df, book_ratings_df
-    genre_columns = get_genre_columns(movies_df)
-    seen_movie_ids = set(ratings_df[ratings_df['userId'] == user_id]['movieId'])
-    user_ratings = ratings_df[ratings_df['userId'] == user_id]
-    is_new_user = user_ratings.empty
-    cold_start_message = None
-    rated_books = get_rated_books(user_id, book_ratings_df)
-    movie_book_pairs = []
-    n_books_per_movie = 3
-    # Handle rating submission
-    if request.method == 'POST':
-        rate_type = request.form.get('rate_type')
-        rating = request.form.get('rating')
-        try:
-            rating = float(rating)
-        except (TypeError, ValueError):
-            flash('Please enter a valid rating between 1 and 5.')
+def create_app(start_warmup=True):
+    app = Flask(__name__)
+    app.secret_key = '32'
+    app.logger.setLevel(logging.INFO)
+    # 'batched' sends one JSON-mode prompt per page; 'per_pair' sends one prompt per movie/books pair
+    app.config['EXPLANATION_MODE'] = os.environ.get('EXPLANATION_MODE', 'batched')
+    state = WarmupState()
+    app.extensions['warmup'] = state
+
+    # Liveness: the process is up and serving requests
+    @app.route('/healthz')
+    def healthz():
+        return jsonify(status='ok')
+
+    # Readiness: datasets and models are loaded
+    @app.route('/readyz')
+    def readyz():
+        if state.ready.is_set():
+            return jsonify(status='ready', timings=dict(state.timings))
+        if state.error:
+            return jsonify(status='failed', error=state.error, timings=dict(state.timings)), 503
+        # Snapshot: warm-up threads may still be adding timings while this is serialized
+        return jsonify(status='warming_up', timings=dict(state.timings)), 503
+
+    @app.before_request
+    def require_warm_data():
+        if request.endpoint in ('healthz', 'readyz', 'static', 'home') or state.ready.is_set():
+            return None
+        return 'The recommender is still loading its data, please retry shortly.', 503, {'Retry-After': '5'}
+
+    @app.route('/', methods=['GET', 'POST'])
+    def home():
+        if request.method == 'POST':
+            user_id = int(request.form['user_id'])
+            session['user_id'] = user_id
             return redirect(url_for('recommend'))
-        if not (1.0 <= rating <= 5.0):
-            flash('Please enter a rating between 1 and 5.')
+        return render_template('home.html')
+
+    @app.route('/recommend', methods=['GET', 'POST'])
+    def recommend():
+        user_id = session.get('user_id', None)
+        if user_id is None:
+            return redirect(url_for('home'))
+        data = state.data
+        movies_df, ratings_df, book_ratings_df = data['movies_df'], data['ratings_df'], data['book_ratings_df']
+        books_df, book_stats, movie_vocab = data['books_df'], data['book_stats'], data['movie_vocab']
+        genre_vocab, get_top_books = data['genre_vocab'], data['get_top_books']
+        seen_movie_ids = set(ratings_df[ratings_df['userId'] == user_id]['movieId'])
+        user_ratings = ratings_df[ratings_df['userId'] == user_id]
+        is_new_user = user_ratings.empty
+        cold_start_message = None
+        rated_books = get_rated_books(user_id, book_ratings_df)
+        movie_book_pairs = []
+        n_books_per_movie = 3
+        # Handle rating submission
+        if request.method == 'POST':
+            rate_type = request.form.get('rate_type')
+            rating = request.form.get('rating')
+            try:
+                rating = float(rating)
+            except (TypeError, ValueError):
+                flash('Please enter a valid rating between 1 and 5.')
+                return redirect(url_for('recommend'))
+            if not (1.0 <= rating <= 5.0):
+                flash('Please enter a rating between 1 and 5.')
+                return redirect(url_for('recommend'))
+            if rate_type == 'movie':
+                movie_id = int(request.form.get('movie_id'))
+                new_row = pd.DataFrame({'userId': [user_id], 'movieId': [movie_id], 'rating': [rating], 'timestamp': [pd.Timestamp.now()]})
+                data['ratings_df'] = pd.concat([ratings_df, new_row], ignore_index=True)
+            elif rate_type == 'book':
+                isbn = request.form.get('isbn')
+                new_row = pd.DataFrame({
+                    'User-ID': [user_id], 'ISBN': [isbn], 'Book-Rating': [int(rating)],
+                    'isbn_idx': encode([isbn], data['isbn_vocab']), 'user_idx': encode([user_id], data['book_user_vocab'])
+                })
+                data['book_ratings_df'] = pd.concat([book_ratings_df, new_row], ignore_index=True)
             return redirect(url_for('recommend'))
-        if rate_type == 'movie':
-            movie_id = int(request.form.get('movie_id'))
-            new_row = pd.DataFrame({'userId': [user_id], 'movieId': [movie_id], 'rating': [rating], 'timestamp': [pd.Timestamp.now()]})
-            ratings_df = pd.concat([ratings_df, new_row], ignore_index=True)
-        elif rate_type == 'book':
-            isbn = request.form.get('isbn')
-            new_row = pd.DataFrame({'User-ID': [user_id], 'ISBN': [isbn], 'Book-Rating': [int(rating)]})
-            book_ratings_df = pd.concat([book_ratings_df, new_row], ignore_index=True)
-        return redirect(url_for('recommend'))
-    # Generate recommendations (after any rating update)
-    already_recommended_books = set()
-    if is_new_user:
-        movie_recs = get_cold_start_recommendations(movies_df, ratings_df, min_ratings=1000, n=5)
-        cold_start_message = "You are a new user! Here are some highly rated movies and books to get you started."
-        top_books = get_top_books(book_stats, books_df, min_ratings=50, n=n_books_per_movie + len(rated_books))
-        top_books = [b for b in top_books if b['ISBN'] not in rated_books][:n_books_per_movie]
-        for _, movie_row in movie_recs.iterrows():
-            explanation = (
-                "**Why this pair?**\n\n" +
-                "- The movie and books are highly rated by many users.\n" +
-                "- These books are selected to give you a variety of top choices to start your reading journey!"
+        # Generate recommendations (after any rating update)
+        already_recommended_books = set()
+        if is_new_user:
+            movie_recs = get_cold_start_recommendations(movies_df, ratings_df, min_ratings=1000, n=5)
+            cold_start_message = "You are a new user! Here are some highly rated movies and books to get you started."
+            top_books = get_top_books(book_stats, books_df, min_ratings=50, n=n_books_per_movie + len(rated_books))
+            top_books = [b for b in top_books if b['isbn_idx'] not in rated_books][:n_books_per_movie]
+            for _, movie_row in movie_recs.iterrows():
+                explanation = (
+                    "**Why this pair?**\n\n" +
+                    "- The movie and books are highly rated by many users.\n" +
+                    "- These books are selected to give you a variety of top choices to start your reading journey!"
+                )
+                movie_book_pairs.append({
+                    'movie': movie_row,
+                    'books': top_books,
+                    'explanation': explanation
+                })
+                already_recommended_books.update([b['isbn_idx'] for b in top_books])
+        else:
+            user_profile = build_user_profile(ratings_df, movies_df, user_id, genre_vocab, movie_vocab)
+            movie_recs = recommend_movies(user_profile, movies_df, genre_vocab, movie_vocab, n=5, seen_movie_ids=seen_movie_ids)
+            for _, movie_row in movie_recs.iterrows():
+                books = find_matching_books(
+                    movie_row['genres'], books_df, book_stats, data['genre_candidates'], data['candidate_book_records'],
+                    rated_books, already_recommended_books, get_top_books, min_ratings=50, n=n_books_per_movie
+                )
+                already_recommended_books.update([b['isbn_idx'] for b in books])
+                movie_book_pairs.append({
+                    'movie': movie_row,
+                    'books': books,
+                    'explanation': None
+                })
+            # Flush the cards right after scoring; explanations are streamed into them as they complete
+            explanation_stream = stream_explanations(
+                app.config['EXPLANATION_MODE'], user_profile, genre_vocab, movie_book_pairs, app.logger
+            )
+            return stream_template(
+                'recommend.html', movie_book_pairs=movie_book_pairs,
+                cold_start_message=cold_start_message, explanation_stream=explanation_stream
             )
-            movie_book_pairs.append({
-                'movie': movie_row,
-                'books': top_books,
-                'explanation': explanation
-            })
-            already_recommended_books.update([b['ISBN'] for b in top_books])
-    else:
-        user_profile = build_user_profile(ratings_df, movies_df, user_id, genre_columns)
-        movie_recs = recommend_movies(user_profile, movies_df, genre_columns, n=5, seen_movie_ids=seen_movie_ids)
-        for _, movie_row in movie_recs.iterrows():
-            movie_genres = movie_row['genres'].split('|') if isinstance(movie_row['genres'], str) else []
-            books = find_matching_books(movie_genres, books_df, book_stats, rated_books, already_recommended_books, min_ratings=50, n=n_books_per_movie)
-            already_recommended_books.update([b['ISBN'] for b in books])
-            book_titles = [b['Book-Title'] for b in books]
+        return render_template('recommend.html', movie_book_pairs=movie_book_pairs, cold_start_message=cold_start_message)
+
+    @app.route('/add_user', methods=['GET', 'POST'])
+    def add_user():
+        if request.method == 'POST':
+            ratings_df = state.data['ratings_df']
+            max_user_id = ratings_df['userId'].max() if not ratings_df.empty else 0
+            new_user_id = int(max_user_id) + 1
+            session['user_id'] = new_user_id
+            flash(f'New user created! Your User ID is {new_user_id}.')
+            return redirect(url_for('recommend'))
+        return render_template('add_user.html')
+
+    @app.route('/nl_query', methods=['GET', 'POST'])
+    def nl_query():
+        suggestions = None
+        if request.method == 'POST':
+            movie_name = request.form.get('movie_name', '').strip()
+            description = request.form.get('description', '').strip()
             prompt = (
-                "You are a helpful recommender system. Provide a brief, friendly, and well-structured explanation in Markdown (2-3 bullet points max) for why this movie and these books are recommended together. "
-                "Use bullet points for each reason.\n"
-                f"User's genre preferences: {dict(zip(genre_columns, user_profile.round(2)))}. "
-                f"Movie: {movie_row['title']} (Genres: {', '.join(movie_genres)}). "
-                f"Books: {book_titles}. "
-                "Focus on genre, themes, and what the user might enjoy."
+                "You are a helpful recommender system. Provide a brief, friendly, and well-structured list in Markdown (2-3 bullet points max) for movies that match the user's request. "
+                "Use bullet points for each suggestion.\n"
+                f"Reference movie: '{movie_name}'. User's description: '{description}'. "
+                f"Here are the available movies (title and genres):\n" +
+                '\n'.join(f"- {row['title']} ({row['genres']})" for _, row in state.data['movies_df'].iterrows()) +
+                "\nFor each suggestion, provide a short explanation."
             )
-            explanation = gemini_generate_content(prompt)
-            movie_book_pairs.append({
-                'movie': movie_row,
-                'books': books,
-                'explanation': explanation
-            })
-    return render_template('recommend.html', movie_book_pairs=movie_book_pairs, cold_start_message=cold_start_message)
-
-@app.route('/add_user', methods=['GET', 'POST'])
-def add_user():
-    if request.method == 'POST':
-        max_user_id = ratings_df['userId'].max() if not ratings_df.empty else 0
-        new_user_id = int(max_user_id) + 1
-        session['user_id'] = new_user_id
-        flash(f'New user created! Your User ID is {new_user_id}.')
-        return redirect(url_for('recommend'))
-    return render_template('add_user.html')
-
-@app.route('/nl_query', methods=['GET', 'POST'])
-def nl_query():
-    suggestions = None
-    if request.method == 'POST':
-        movie_name = request.form.get('movie_name', '').strip()
-        description = request.form.get('description', '').strip()
-        prompt = (
-            "You are a helpful recommender system. Provide a brief, friendly, and well-structured list in Markdown (2-3 bullet points max) for movies that match the user's request. "
-            "Use bullet points for each suggestion.\n"
-            f"Reference movie: '{movie_name}'. User's description: '{description}'. "
-            f"Here are the available movies (title and genres):\n" +
-            '\n'.join(f"- {row['title']} ({row['genres']})" for _, row in movies_df.iterrows()) +
-            "\nFor each suggestion, provide a short explanation."
-        )
-        suggestions = gemini_generate_content(prompt, max_tokens=512)
-    return render_template('nl_query.html', suggestions=suggestions)
+            suggestions = gemini_generate_content(prompt, max_tokens=512)
+        return render_template('nl_query.html', suggestions=suggestions)
+
+    if start_warmup:
+        threading.Thread(target=warm_up, args=(state, app.logger), name='warm-up', daemon=True).start()
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    create_app().run(debug=True)
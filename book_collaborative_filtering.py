@@ -1,55 +1,86 @@
 import pandas as pd
 import numpy as np
-from sklearn.decomposition import TruncatedSVD
 from scipy.sparse import csr_matrix
+from id_encoding import encode_book_data
+from matrix_factorization import fit_factors
 
-# Load cleaned data
-def load_book_data(books_path='books_cleaned.csv', ratings_path='book_ratings_cleaned.csv', stats_path='book_stats.csv'):
-    books_df = pd.read_csv(books_path)
-    ratings_df = pd.read_csv(ratings_path)
-    book_stats = pd.read_csv(stats_path)
+# Load cleaned data and attach dense integer codes (isbn_idx, user_idx)
+def load_book_data(books_path='books_cleaned.csv', ratings_path='book_ratings_cleaned.csv', stats_path='book_stats.csv', return_vocabs=False):
+    books_df = pd.read_csv(books_path, dtype={'ISBN': 'str'})
+    ratings_df = pd.read_csv(ratings_path, dtype={'ISBN': 'str'})
+    book_stats = pd.read_csv(stats_path, dtype={'ISBN': 'str'})
+    books_df, ratings_df, book_stats, user_vocab, isbn_vocab = encode_book_data(books_df, ratings_df, book_stats)
+    if return_vocabs:
+        return books_df, ratings_df, book_stats, user_vocab, isbn_vocab
     return books_df, ratings_df, book_stats
 
-# Filter to active users and popular books for memory efficiency
-def filter_active(ratings_df, min_user_ratings=10, min_book_ratings=10):
-    user_counts = ratings_df['User-ID'].value_counts()
-    book_counts = ratings_df['ISBN'].value_counts()
-    active_users = user_counts[user_counts >= min_user_ratings].index
-    popular_books = book_counts[book_counts >= min_book_ratings].index
-    filtered = ratings_df[ratings_df['User-ID'].isin(active_users) & ratings_df['ISBN'].isin(popular_books)]
-    return filtered
+# Columns of book_stats to join onto books_df by integer code
+def _stats_columns(book_stats):
+    return book_stats[['isbn_idx', 'avg_rating', 'num_ratings']]
 
-# Build sparse user-book matrix and index mappings
+# Filter to active users and popular books for memory efficiency.
+# Dropping thin books can push users below the threshold (and vice versa), so
+# the filter is repeated on integer codes until it reaches a k-core fixed point.
+def filter_active(ratings_df, min_user_ratings=10, min_book_ratings=10, max_iter=50, verbose=False):
+    if 'user_idx' in ratings_df.columns and 'isbn_idx' in ratings_df.columns:
+        user_codes = ratings_df['user_idx'].to_numpy()
+        book_codes = ratings_df['isbn_idx'].to_numpy()
+    else:
+        user_codes = pd.factorize(ratings_df['User-ID'])[0]
+        book_codes = pd.factorize(ratings_df['ISBN'])[0]
+    keep = (user_codes >= 0) & (book_codes >= 0)
+    n_users_total = int(user_codes.max()) + 1 if len(user_codes) else 0
+    n_books_total = int(book_codes.max()) + 1 if len(book_codes) else 0
+    for iteration in range(1, max_iter + 1):
+        user_counts = np.bincount(user_codes[keep], minlength=n_users_total)
+        book_counts = np.bincount(book_codes[keep], minlength=n_books_total)
+        next_keep = keep & (user_counts[user_codes] >= min_user_ratings) & (book_counts[book_codes] >= min_book_ratings)
+        n_kept = int(next_keep.sum())
+        if verbose:
+            n_users = int(np.count_nonzero(np.bincount(user_codes[next_keep], minlength=n_users_total)))
+            n_books = int(np.count_nonzero(np.bincount(book_codes[next_keep], minlength=n_books_total)))
+            print(f"k-core iteration {iteration}: {n_kept} ratings, {n_users} users, {n_books} books")
+        if n_kept == int(keep.sum()):
+            break
+        keep = next_keep
+    return ratings_df[keep]
+
+# Build sparse user-book matrix and index mappings.
+# Rows/columns are compacted from the persisted integer codes with np.unique, so no
+# per-rating dict lookups are needed; the mappings are Series keyed by User-ID / ISBN.
 def build_sparse_user_book_matrix(ratings_df):
-    user_ids = ratings_df['User-ID'].unique()
-    book_isbns = ratings_df['ISBN'].unique()
-    user_id_to_idx = {uid: idx for idx, uid in enumerate(user_ids)}
-    book_isbn_to_idx = {isbn: idx for idx, isbn in enumerate(book_isbns)}
-    row = ratings_df['User-ID'].map(user_id_to_idx)
-    col = ratings_df['ISBN'].map(book_isbn_to_idx)
-    data = ratings_df['Book-Rating'].astype(float)
+    user_codes = ratings_df['user_idx'].to_numpy()
+    book_codes = ratings_df['isbn_idx'].to_numpy()
+    _, user_first, row = np.unique(user_codes, return_index=True, return_inverse=True)
+    _, book_first, col = np.unique(book_codes, return_index=True, return_inverse=True)
+    user_ids = ratings_df['User-ID'].to_numpy()[user_first]
+    book_isbns = ratings_df['ISBN'].to_numpy()[book_first]
+    user_id_to_idx = pd.Series(np.arange(len(user_ids), dtype=np.int32), index=user_ids)
+    book_isbn_to_idx = pd.Series(np.arange(len(book_isbns), dtype=np.int32), index=book_isbns)
+    data = ratings_df['Book-Rating'].to_numpy(dtype=np.float32)
     matrix = csr_matrix((data, (row, col)), shape=(len(user_ids), len(book_isbns)))
     return matrix, user_id_to_idx, book_isbn_to_idx, user_ids, book_isbns
 
-# Collaborative filtering using SVD on sparse matrix
-def get_book_recommendations_sparse(user_id, matrix, user_id_to_idx, book_isbn_to_idx, user_ids, book_isbns, books_df, ratings_df, n=5):
+# Collaborative filtering on sparse matrix ('svd' by default, or 'als'; see matrix_factorization.py)
+def get_book_recommendations_sparse(user_id, matrix, user_id_to_idx, book_isbn_to_idx, user_ids, book_isbns, books_df, ratings_df, n=5, engine='svd'):
     if user_id not in user_id_to_idx:
         return []
-    svd = TruncatedSVD(n_components=20, random_state=42)
-    latent_matrix = svd.fit_transform(matrix)
+    latent_matrix, book_vectors = fit_factors(matrix, engine=engine, n_factors=20)
     user_idx = user_id_to_idx[user_id]
     user_vector = latent_matrix[user_idx]
-    book_vectors = svd.components_.T
     scores = np.dot(book_vectors, user_vector)
     # Exclude already rated books
-    already_rated = set(ratings_df[ratings_df['User-ID'] == user_id]['ISBN'])
+    rated_isbns = ratings_df.loc[ratings_df['User-ID'] == user_id, 'ISBN'].unique()
+    rated_cols = book_isbn_to_idx.reindex(rated_isbns).dropna().to_numpy(dtype=np.int64)
+    scores[rated_cols] = -np.inf
+    books_by_isbn = books_df.drop_duplicates('ISBN').set_index('ISBN', drop=False)
     recs = []
     for idx in np.argsort(scores)[::-1]:
+        if scores[idx] == -np.inf:
+            break
         isbn = book_isbns[idx]
-        if isbn not in already_rated:
-            book_row = books_df[books_df['ISBN'] == isbn]
-            if not book_row.empty:
-                recs.append(book_row.iloc[0])
+        if isbn in books_by_isbn.index:
+            recs.append(books_by_isbn.loc[isbn])
             if len(recs) >= n:
                 break
     return recs
@@ -57,7 +88,7 @@ def get_book_recommendations_sparse(user_id, matrix, user_id_to_idx, book_isbn_t
 # For new users: recommend top-rated books
 def get_top_books(book_stats, books_df, min_ratings=50, n=5):
     popular_books = book_stats[book_stats['num_ratings'] >= min_ratings]
-    top_books = pd.merge(popular_books, books_df, on='ISBN')
+    top_books = pd.merge(_stats_columns(popular_books), books_df.drop(columns=['avg_rating', 'num_ratings'], errors='ignore'), on='isbn_idx')
     top_books = top_books.sort_values('avg_rating', ascending=False)
     return top_books.head(n).to_dict('records')
 
@@ -66,7 +97,7 @@ def find_matching_book(movie_genres, books_df, book_stats, min_ratings=50):
     for genre in movie_genres:
         matches = books_df[books_df['Book-Title'].str.contains(genre, case=False, na=False)]
         if not matches.empty:
-            matches = pd.merge(matches, book_stats, on='ISBN')
+            matches = pd.merge(matches.drop(columns=['avg_rating', 'num_ratings'], errors='ignore'), _stats_columns(book_stats), on='isbn_idx')
             matches = matches[matches['num_ratings'] >= min_ratings]
             if not matches.empty:
                 return matches.sort_values('avg_rating', ascending=False).iloc[0].to_dict()
@@ -74,7 +105,7 @@ def find_matching_book(movie_genres, books_df, book_stats, min_ratings=50):
 
 if __name__ == '__main__':
     books_df, ratings_df, book_stats = load_book_data()
-    filtered_ratings = filter_active(ratings_df, min_user_ratings=10, min_book_ratings=10)
+    filtered_ratings = filter_active(ratings_df, min_user_ratings=10, min_book_ratings=10, verbose=True)
     matrix, user_id_to_idx, book_isbn_to_idx, user_ids, book_isbns = build_sparse_user_book_matrix(filtered_ratings)
     # Example usage:
     user_id = user_ids[0]  # Use a real/active user ID
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from id_encoding import normalize_isbn, load_or_build_vocab, save_vocab, BOOK_USER_VOCAB_PATH, ISBN_VOCAB_PATH
 
 def load_and_prepare_book_data():
     """Load and prepare Book-Crossing data from the root directory."""
@@ -72,6 +73,10 @@ def load_and_prepare_book_data():
         books_df = books_df.dropna(subset=['ISBN', 'Book-Title'])
         ratings_df = ratings_df.dropna()
         
+        # Strip padding from ISBNs so they join cleanly
+        books_df['ISBN'] = normalize_isbn(books_df['ISBN'])
+        ratings_df['ISBN'] = normalize_isbn(ratings_df['ISBN'])
+        
         # Convert ratings to numeric, removing non-numeric values
         ratings_df['Book-Rating'] = pd.to_numeric(ratings_df['Book-Rating'], errors='coerce')
         ratings_df = ratings_df.dropna(subset=['Book-Rating'])
@@ -92,6 +97,15 @@ def load_and_prepare_book_data():
             (books_df['Year-Of-Publication'] <= 2024)
         ]
         
+        # Persist dense id dictionaries for users and ISBNs (append-only, so existing codes never move)
+        print("🔢 Updating user and ISBN id dictionaries...")
+        ratings_df['User-ID'] = ratings_df['User-ID'].astype('int64')
+        user_vocab = load_or_build_vocab(BOOK_USER_VOCAB_PATH, ratings_df['User-ID'], dtype='int64')
+        isbn_vocab = load_or_build_vocab(ISBN_VOCAB_PATH, books_df['ISBN'], ratings_df['ISBN'], dtype='str')
+        save_vocab(user_vocab, BOOK_USER_VOCAB_PATH)
+        save_vocab(isbn_vocab, ISBN_VOCAB_PATH)
+        print(f"✅ Id dictionaries saved to: {BOOK_USER_VOCAB_PATH}, {ISBN_VOCAB_PATH}")
+        
         # Calculate book statistics
         print("📊 Calculating book statistics...")
         book_stats = ratings_df.groupby('ISBN').agg({
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from id_encoding import encode
+
+CANDIDATES_PATH = 'movie_book_candidates.csv'
+
+# Rank candidate books for every distinct `genres` combination in the movie catalog.
+# A book is a candidate when its title mentions one of the movie's genres (same rule as
+# the old per-request matching); candidates are ordered by average rating.
+def build_candidate_table(movies_df, books_df, book_stats, min_ratings=50, max_candidates=50):
+    stats = book_stats.loc[book_stats['num_ratings'] >= min_ratings, ['ISBN', 'avg_rating', 'num_ratings']]
+    rated_books = books_df[['ISBN', 'Book-Title']].drop_duplicates('ISBN').merge(stats, on='ISBN')
+    rated_books = rated_books.sort_values('avg_rating', ascending=False, kind='stable').reset_index(drop=True)
+    titles = rated_books['Book-Title'].astype(str)
+    genre_combinations = movies_df['genres'].dropna().unique()
+    # One title scan per individual genre; combinations are ORs of these masks
+    genre_masks = {}
+    for genres in genre_combinations:
+        for genre in genres.split('|'):
+            if genre not in genre_masks:
+                genre_masks[genre] = titles.str.contains(genre, case=False, regex=False).to_numpy()
+    rows = []
+    for genres in genre_combinations:
+        mask = np.zeros(len(rated_books), dtype=bool)
+        for genre in genres.split('|'):
+            mask |= genre_masks[genre]
+        ranked = rated_books.loc[mask, 'ISBN'].head(max_candidates)
+        rows.append(pd.DataFrame({'genres': genres, 'rank': np.arange(len(ranked)), 'ISBN': ranked.to_numpy()}))
+    if not rows:
+        return pd.DataFrame(columns=['genres', 'rank', 'ISBN'])
+    return pd.concat(rows, ignore_index=True)
+
+# Build parameters plus a content hash of every input the table depends on
+# (movie genre combinations, book titles, book stats); stored next to the table
+def candidate_build_info(movies_df, books_df, book_stats, min_ratings=50, max_candidates=50):
+    digest = hashlib.sha256()
+    inputs = (
+        pd.DataFrame({'genres': np.sort(movies_df['genres'].dropna().unique())}),
+        books_df[['ISBN', 'Book-Title']],
+        book_stats[['ISBN', 'avg_rating', 'num_ratings']],
+    )
+    for frame in inputs:
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return {'min_ratings': min_ratings, 'max_candidates': max_candidates, 'inputs_sha256': digest.hexdigest()}
+
+def _build_info_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+# Write `path` through a uniquely named temp file in the same directory, then rename it into place
+def _atomic_write(path, write):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+# Write the table and its build info; each writer uses its own temp file, so concurrent
+# workers never read a partial file or rename each other's temp files
+def save_candidate_table(candidate_df, path=CANDIDATES_PATH, build_info=None):
+    _atomic_write(path, lambda f: candidate_df.to_csv(f, index=False))
+    if build_info is not None:
+        _atomic_write(_build_info_path(path), lambda f: json.dump(build_info, f, indent=2))
+
+def _load_build_info(path):
+    try:
+        with open(_build_info_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# Load the persisted table if it was built with the same parameters from the same inputs;
+# otherwise rebuild it and save it for the next start
+def load_or_build_candidate_table(movies_df, books_df, book_stats, path=CANDIDATES_PATH, min_ratings=50, max_candidates=50):
+    build_info = candidate_build_info(movies_df, books_df, book_stats, min_ratings=min_ratings, max_candidates=max_candidates)
+    if os.path.exists(path) and _load_build_info(path) == build_info:
+        return pd.read_csv(path, dtype={'genres': 'str', 'rank': 'int32', 'ISBN': 'str'})
+    candidate_df = build_candidate_table(movies_df, books_df, book_stats, min_ratings=min_ratings, max_candidates=max_candidates)
+    try:
+        save_candidate_table(candidate_df, path, build_info)
+    except OSError as e:
+        # e.g. a read-only deploy directory: keep serving from the in-memory table
+        print(f"⚠️  Could not save candidate table to {path}: {e}")
+    return candidate_df
+
+# Turn the long table into {genres: isbn_idx array} plus the display records for those books
+def index_candidate_table(candidate_df, books_df, book_stats, isbn_vocab):
+    candidate_df = candidate_df.sort_values(['genres', 'rank'], kind='stable')
+    codes = encode(candidate_df['ISBN'], isbn_vocab)
+    candidates = {}
+    for genres, group in candidate_df.assign(isbn_idx=codes).groupby('genres', sort=False):
+        group_codes = group['isbn_idx'].to_numpy()
+        candidates[genres] = group_codes[group_codes >= 0]
+    candidate_codes = np.unique(codes[codes >= 0])
+    books = books_df[books_df['isbn_idx'].isin(candidate_codes)].drop_duplicates('isbn_idx')
+    books = books.drop(columns=['avg_rating', 'num_ratings'], errors='ignore')
+    books = books.merge(book_stats[['isbn_idx', 'avg_rating', 'num_ratings']], on='isbn_idx')
+    book_records = {record['isbn_idx']: record for record in books.to_dict('records')}
+    return candidates, book_records
+
+# Request-time pairing: walk the precomputed ranking, skipping rated/already-recommended books
+def lookup_candidate_books(genres, candidates, book_records, excluded, n=3):
+    books = []
+    for code in candidates.get(genres, ()):
+        code = int(code)
+        if code in excluded or code not in book_records:
+            continue
+        books.append(book_records[code])
+        if len(books) >= n:
+            break
+    return books
+
+if __name__ == '__main__':
+    from book_collaborative_filtering import load_book_data
+    movies_df = pd.read_csv('movies_cleaned.csv', usecols=['movieId', 'genres'])
+    books_df, ratings_df, book_stats = load_book_data()
+    candidate_df = build_candidate_table(movies_df, books_df, book_stats)
+    save_candidate_table(candidate_df, build_info=candidate_build_info(movies_df, books_df, book_stats))
+    print(f"Saved {len(candidate_df)} candidates for {candidate_df['genres'].nunique()} genre combinations to {CANDIDATES_PATH}")
@@ -3,6 +3,7 @@ import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import os
+from id_encoding import load_or_build_vocab, save_vocab, MOVIE_ID_VOCAB_PATH
 
 def load_and_prepare_data():
     """Load and prepare MovieLens data from the root directory."""
@@ -16,14 +17,10 @@ def load_and_prepare_data():
     
     # Check if rating.csv exists, if not, try to download it
     if not os.path.exists(rating_file):
-        print(f"⚠️  {rating_file} not found. Attempting to download from Google Drive...")
+        print(f"⚠️  {rating_file} not found. Attempting to download it...")
         try:
-            import gdown
-            url = "https://drive.google.com/uc?id=1G3LrNhQ_Aou5_H9AGuGFL5YD5SJAsoG-"
-            gdown.download(url, rating_file, quiet=False)
-            if not os.path.exists(rating_file):
-                raise Exception("Failed to download rating.csv")
-            print(f"✅ Successfully downloaded {rating_file}")
+            from download_large_files import fetch_file
+            fetch_file(rating_file)
         except Exception as e:
             print(f"❌ Error downloading {rating_file}: {e}")
             print("Please run 'python download_large_files.py' to download required files.")
@@ -79,6 +76,13 @@ def load_and_prepare_data():
         movies_df['avg_rating'] = movies_df['avg_rating'].fillna(0)
         movies_df['num_ratings'] = movies_df['num_ratings'].fillna(0)
         
+        # Persist the dense movie id dictionary; existing codes are kept and new ids appended,
+        # so codes stay stable across runs
+        print("🔢 Updating movie id dictionary...")
+        movie_vocab = load_or_build_vocab(MOVIE_ID_VOCAB_PATH, movies_df['movieId'], dtype='int64')
+        save_vocab(movie_vocab, MOVIE_ID_VOCAB_PATH)
+        print(f"✅ Movie id dictionary saved to: {MOVIE_ID_VOCAB_PATH} ({len(movie_vocab)} ids)")
+        
         # Save processed data to root directory
         processed_movies_path = "movies_cleaned.csv"
         processed_ratings_path = "ratings_cleaned.csv"
@@ -1,58 +1,184 @@
+import argparse
+import hashlib
+import json
 import os
-import gdown
+import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
 
-def download_large_files():
-    """Download large CSV files from Google Drive that are too big for GitHub."""
-    
-    # Google Drive file IDs and their corresponding local filenames
-    files_to_download = {
-        '1G3LrNhQ_Aou5_H9AGuGFL5YD5SJAsoG-': 'rating.csv',
-        '19RYqakQfY0dazo8uuNHxHFRgIVme7kKE': 'ratings_cleaned.csv'
-    }
-    
-    print("📥 Downloading large CSV files from Google Drive...")
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_manifest.json')
+CHUNK_SIZE = 1024 * 1024
+
+def load_manifest(path=MANIFEST_PATH):
+    """Load the manifest mapping each large file to its url, size and sha256."""
+    with open(path) as f:
+        return json.load(f)
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def verify_file(path, entry, check_hash=True):
+    """Check a file against its manifest entry. Fields left null in the manifest are not checked."""
+    if not os.path.exists(path):
+        return False
+    if entry.get('size') is not None and os.path.getsize(path) != entry['size']:
+        return False
+    if check_hash and entry.get('sha256') and sha256_file(path) != entry['sha256']:
+        return False
+    return True
+
+def _parse_content_range(value):
+    """Return (start, total) from 'bytes 100-199/1000' or 'bytes */1000'; unknown parts are None."""
+    if not value or '/' not in value:
+        return None, None
+    span, total = value.split(' ', 1)[-1].rsplit('/', 1)
+    start = span.split('-', 1)[0]
+    return (int(start) if start.isdigit() else None), (int(total) if total.strip().isdigit() else None)
+
+def _download_http(url, part_path, expected_size=None):
+    """Download url into part_path, resuming from its current length with an HTTP Range request.
+
+    HTML responses (quota / confirmation pages) are rejected, and the bytes on disk are
+    checked against Content-Range / Content-Length (and the manifest size when pinned).
+    """
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+    restart = False
+    with requests.get(url, headers=headers, stream=True, timeout=60) as response:
+        if response.status_code == 416:
+            # Range not satisfiable: only complete if the partial file is exactly the full length
+            _, total = _parse_content_range(response.headers.get('Content-Range'))
+            total = total if total is not None else expected_size
+            if total is not None and offset == total and (expected_size is None or total == expected_size):
+                return
+            restart = True
+        else:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type == 'text/html':
+                raise RuntimeError(f"{url} returned an HTML page (e.g. a quota or confirmation page) instead of the file")
+            # 206 means the server honoured the range; anything else restarts from scratch
+            if response.status_code == 206:
+                start, total = _parse_content_range(response.headers.get('Content-Range'))
+                if start != offset:
+                    raise RuntimeError(f"{url} resumed at byte {start}, expected {offset}")
+                mode, size = 'ab', offset
+            else:
+                content_length = response.headers.get('Content-Length')
+                encoded = response.headers.get('Content-Encoding', 'identity') != 'identity'
+                total = int(content_length) if content_length and content_length.isdigit() and not encoded else None
+                mode, size = 'wb', 0
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    size += len(chunk)
+    if restart:
+        print(f"⚠️  {os.path.basename(part_path)} does not match the server's length, restarting download...")
+        os.remove(part_path)
+        return _download_http(url, part_path, expected_size)
+    if total is not None and size != total:
+        raise RuntimeError(f"{url} ended after {size} of {total} bytes; run again to resume")
+    if expected_size is not None and total is not None and total != expected_size:
+        raise RuntimeError(f"{url} serves {total} bytes but the manifest expects {expected_size}")
+
+def fetch_file(filename, manifest=None, dest_dir='.', mirror_dir=None, base_url=None, verify_existing=True, require_verified=False):
+    """Fetch one manifest file into dest_dir and return its path.
+
+    Sources, in order: a local mirror directory, a base URL (e.g. a local HTTP server
+    serving the same filenames), then the manifest URL. DATA_MIRROR_DIR / DATA_BASE_URL
+    are used when the arguments are not given. The download goes to <file>.part, is
+    verified against the manifest and then atomically renamed into place. Entries with
+    no pinned size or sha256 are fetched with only the HTTP length/HTML checks and a
+    warning, or refused when require_verified (or DATA_REQUIRE_VERIFIED=1) is set.
+    """
+    manifest = manifest if manifest is not None else load_manifest()
+    entry = manifest[filename]
+    mirror_dir = mirror_dir or os.environ.get('DATA_MIRROR_DIR')
+    base_url = base_url or os.environ.get('DATA_BASE_URL')
+    require_verified = require_verified or os.environ.get('DATA_REQUIRE_VERIFIED') == '1'
+    dest_path = os.path.join(dest_dir, filename)
+    if verify_file(dest_path, entry, check_hash=verify_existing):
+        print(f"✅ {filename} already exists, skipping...")
+        return dest_path
+    if entry.get('size') is None and not entry.get('sha256'):
+        if require_verified:
+            raise RuntimeError(
+                f"{filename} has no size/sha256 pinned in the manifest. Run 'python download_large_files.py "
+                f"--update-manifest' on a trusted copy first."
+            )
+        print(f"⚠️  {filename} has no size/sha256 pinned in the manifest; only the HTTP length checks apply. "
+              f"Run 'python download_large_files.py --update-manifest' on a trusted copy to pin it.")
+    part_path = dest_path + '.part'
+    if mirror_dir and os.path.exists(os.path.join(mirror_dir, filename)):
+        print(f"📥 Copying {filename} from mirror {mirror_dir}...")
+        shutil.copyfile(os.path.join(mirror_dir, filename), part_path)
+    else:
+        url = f"{base_url.rstrip('/')}/{filename}" if base_url else entry['url']
+        print(f"📥 Downloading {filename} from {url}...")
+        _download_http(url, part_path, expected_size=entry.get('size'))
+    if not verify_file(part_path, entry):
+        os.remove(part_path)
+        raise RuntimeError(f"{filename} failed size/checksum verification")
+    os.replace(part_path, dest_path)
+    file_size = os.path.getsize(dest_path) / (1024 * 1024)  # Size in MB
+    print(f"✅ Successfully downloaded {filename} ({file_size:.1f} MB)")
+    return dest_path
+
+def download_large_files(filenames=None, workers=4, dest_dir='.', mirror_dir=None, base_url=None, require_verified=False):
+    """Download large CSV files that are too big for GitHub, several at a time."""
+    manifest = load_manifest()
+    filenames = filenames or list(manifest)
+
+    print("📥 Downloading large CSV files...")
     print("=" * 50)
-    
-    for file_id, filename in files_to_download.items():
-        if os.path.exists(filename):
-            print(f"✅ {filename} already exists, skipping...")
+
+    ok = True
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(fetch_file, filename, manifest, dest_dir, mirror_dir, base_url, True, require_verified): filename
+            for filename in filenames
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"❌ Error downloading {futures[future]}: {e}")
+                ok = False
+
+    if ok:
+        print("\n✅ All large files downloaded successfully!")
+    return ok
+
+def update_manifest(dest_dir='.', path=MANIFEST_PATH):
+    """Record the size and sha256 of the local copies in the manifest."""
+    manifest = load_manifest(path)
+    for filename, entry in manifest.items():
+        local_path = os.path.join(dest_dir, filename)
+        if not os.path.exists(local_path):
+            print(f"⚠️  {filename} not found, leaving its manifest entry unchanged")
             continue
-            
-        print(f"📥 Downloading {filename}...")
-        try:
-            # Construct the Google Drive URL
-            url = f"https://drive.google.com/uc?id={file_id}"
-            
-            # Download the file
-            gdown.download(url, filename, quiet=False)
-            
-            if os.path.exists(filename):
-                file_size = os.path.getsize(filename) / (1024 * 1024)  # Size in MB
-                print(f"✅ Successfully downloaded {filename} ({file_size:.1f} MB)")
-            else:
-                print(f"❌ Failed to download {filename}")
-                
-        except Exception as e:
-            print(f"❌ Error downloading {filename}: {e}")
-            return False
-    
-    print("\n✅ All large files downloaded successfully!")
-    return True
+        entry['size'] = os.path.getsize(local_path)
+        entry['sha256'] = sha256_file(local_path)
+        print(f"✅ {filename}: {entry['size']} bytes, sha256 {entry['sha256']}")
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
 
-def check_required_files():
+def check_required_files(dest_dir='.'):
     """Check if all required files are present."""
-    # Only check for the large files that are downloaded from Google Drive
-    required_files = [
-        'rating.csv',
-        'ratings_cleaned.csv'
-    ]
-    
+    # Only check for the large files listed in the manifest
+    required_files = list(load_manifest())
+
     missing_files = []
     for file in required_files:
-        if not os.path.exists(file):
+        if not os.path.exists(os.path.join(dest_dir, file)):
             missing_files.append(file)
-    
+
     if missing_files:
         print(f"❌ Missing files: {', '.join(missing_files)}")
         return False
@@ -61,20 +187,26 @@ def check_required_files():
         return True
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download the large data files listed in data_manifest.json")
+    parser.add_argument('--mirror', help="local directory holding copies of the files")
+    parser.add_argument('--base-url', help="base URL serving the files by name, e.g. http://localhost:8000")
+    parser.add_argument('--workers', type=int, default=4, help="number of parallel downloads")
+    parser.add_argument('--dest', default='.', help="directory to download into")
+    parser.add_argument('--require-verified', action='store_true', help="refuse files whose manifest entry has no size/sha256 pinned")
+    parser.add_argument('--update-manifest', action='store_true', help="record size/sha256 of the local files in the manifest")
+    args = parser.parse_args()
+
+    if args.update_manifest:
+        update_manifest(args.dest)
+        sys.exit(0)
+
     print("🎬 Movie & Book Recommendation System - File Downloader")
     print("=" * 60)
-    
-    # First check what files are missing
-    print("🔍 Checking for required files...")
-    if check_required_files():
-        print("\n🎉 All files are ready! You can now run the application.")
-        sys.exit(0)
-    
-    # Download missing large files
-    print("\n📥 Downloading missing large files...")
-    if download_large_files():
+
+    # Download (or verify) every file in the manifest
+    if download_large_files(workers=args.workers, dest_dir=args.dest, mirror_dir=args.mirror, base_url=args.base_url, require_verified=args.require_verified):
         print("\n🔍 Final check...")
-        if check_required_files():
+        if check_required_files(args.dest):
             print("\n🎉 All files are ready! You can now run the application.")
             print("\nNext steps:")
             print("1. Run 'python data_preparation.py' to prepare movie data")
@@ -83,4 +215,5 @@ if __name__ == "__main__":
         else:
             print("\n❌ Some files are still missing. Please check the error messages above.")
     else:
-        print("\n❌ Failed to download required files. Please check your internet connection and try again.") 
\ No newline at end of file
+        print("\n❌ Failed to download required files. Please check your internet connection and try again.")
+        sys.exit(1)
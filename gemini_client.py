@@ -1,6 +1,7 @@
 import requests
 import json
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,25 +11,65 @@ if not API_KEY:
     raise ValueError("GEMINI_API_KEY environment variable not set. Please set it in your environment or in a .env file.")
 MODEL_NAME = "gemini-2.0-flash"
 API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{MODEL_NAME}:generateContent?key={API_KEY}"
+EXPLANATION_UNAVAILABLE = "[Explanation unavailable due to API error.]"
 
 
-def gemini_generate_content(prompt, temperature=0.7, max_tokens=256):
+# Accumulate call count, latency and token counts (from usageMetadata) into `usage`
+def _record_usage(usage, result, elapsed):
+    if usage is None:
+        return
+    metadata = (result or {}).get("usageMetadata", {})
+    usage["calls"] = usage.get("calls", 0) + 1
+    usage["seconds"] = usage.get("seconds", 0.0) + elapsed
+    usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + metadata.get("promptTokenCount", 0)
+    usage["output_tokens"] = usage.get("output_tokens", 0) + metadata.get("candidatesTokenCount", 0)
+    usage["total_tokens"] = usage.get("total_tokens", 0) + metadata.get("totalTokenCount", 0)
+
+
+def _post(generation_config, prompt, usage):
     headers = {"Content-Type": "application/json"}
     data = {
         "contents": [{"parts": [{"text": prompt}]}],
-        "generationConfig": {
-            "temperature": temperature,
-            "maxOutputTokens": max_tokens,
-            "topP": 1,
-            "topK": 1
-        }
+        "generationConfig": generation_config
     }
+    start = time.perf_counter()
+    result = None
     try:
         response = requests.post(API_URL, headers=headers, data=json.dumps(data))
         response.raise_for_status()
         result = response.json()
         # Extract the generated text
         return result["candidates"][0]["content"]["parts"][0]["text"]
+    finally:
+        _record_usage(usage, result, time.perf_counter() - start)
+
+
+def gemini_generate_content(prompt, temperature=0.7, max_tokens=256, usage=None):
+    generation_config = {
+        "temperature": temperature,
+        "maxOutputTokens": max_tokens,
+        "topP": 1,
+        "topK": 1
+    }
+    try:
+        return _post(generation_config, prompt, usage)
+    except Exception as e:
+        print(f"Gemini API error: {e}")
+        return EXPLANATION_UNAVAILABLE
+
+
+# Ask for a JSON response matching `response_schema`; returns the parsed value, or None on error
+def gemini_generate_json(prompt, response_schema, temperature=0.7, max_tokens=1024, usage=None):
+    generation_config = {
+        "temperature": temperature,
+        "maxOutputTokens": max_tokens,
+        "topP": 1,
+        "topK": 1,
+        "responseMimeType": "application/json",
+        "responseSchema": response_schema
+    }
+    try:
+        return json.loads(_post(generation_config, prompt, usage))
     except Exception as e:
         print(f"Gemini API error: {e}")
-        return "[Explanation unavailable due to API error.]" 
\ No newline at end of file
+        return None
@@ -0,0 +1,61 @@
+import numpy as np
+
+# Byte value -> its 8 bits, used to expand per-genre weights into per-byte lookup tables
+_BYTE_BITS = ((np.arange(256)[:, None] >> np.arange(8)) & 1).astype(np.float64)
+
+# Sorted genre names found in the pipe-separated `genres` column; bit i of a mask is genre_vocab[i]
+def build_genre_vocab(genres):
+    genre_vocab = sorted(set(genres.dropna().str.split('|').explode()))
+    if len(genre_vocab) > 32:
+        raise ValueError(f"{len(genre_vocab)} genres do not fit in a uint32 bitmask (max 32)")
+    return genre_vocab
+
+# Pack each movie's genres into a single uint32 bitmask
+def pack_genres(genres, genre_vocab):
+    dummies = genres.fillna('').str.get_dummies('|').reindex(columns=genre_vocab, fill_value=0)
+    weights = np.left_shift(1, np.arange(len(genre_vocab)), dtype=np.int64)
+    return (dummies.to_numpy(dtype=np.int64) @ weights).astype(np.uint32)
+
+# Expand bitmasks back to a (n_movies, n_genres) 0/1 matrix
+def unpack_genres(masks, genre_vocab):
+    masks = np.asarray(masks, dtype=np.uint32)
+    return ((masks[:, None] >> np.arange(len(genre_vocab), dtype=np.uint32)) & 1).astype(np.uint8)
+
+# Number of set bits in each uint32, as uint8 on every NumPy version (matching np.bitwise_count)
+def popcount(masks):
+    x = np.asarray(masks, dtype=np.uint32)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x)
+    x = x - ((x >> np.uint32(1)) & np.uint32(0x55555555))
+    x = (x & np.uint32(0x33333333)) + ((x >> np.uint32(2)) & np.uint32(0x33333333))
+    x = (x + (x >> np.uint32(4))) & np.uint32(0x0F0F0F0F)
+    return ((x * np.uint32(0x01010101)) >> np.uint32(24)).astype(np.uint8)
+
+# Weighted overlap profile . movie for every (profile, movie) pair.
+# Each profile is turned into four 256-entry tables (one per mask byte), so a movie's
+# score is four table lookups instead of a dot product over the one-hot columns.
+def weighted_overlap(profiles, masks):
+    profiles = np.atleast_2d(np.asarray(profiles, dtype=np.float64))
+    masks = np.asarray(masks, dtype=np.uint32)
+    padded = np.zeros((profiles.shape[0], 32))
+    padded[:, :profiles.shape[1]] = profiles
+    tables = padded.reshape(-1, 4, 8) @ _BYTE_BITS.T
+    scores = np.zeros((profiles.shape[0], len(masks)))
+    for k in range(4):
+        scores += tables[:, k, (masks >> np.uint32(8 * k)) & np.uint32(0xFF)]
+    return scores
+
+# Cosine similarity between genre-weight profiles and binary genre masks (0 where either is empty)
+def cosine_scores(profiles, masks):
+    profiles = np.atleast_2d(np.asarray(profiles, dtype=np.float64))
+    dots = weighted_overlap(profiles, masks)
+    norms = np.linalg.norm(profiles, axis=1)[:, None] * np.sqrt(popcount(masks).astype(np.float64))[None, :]
+    return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+# Jaccard similarity |a & b| / |a | b| between user masks and movie masks
+def jaccard_scores(user_masks, masks):
+    user_masks = np.atleast_1d(np.asarray(user_masks, dtype=np.uint32))[:, None]
+    masks = np.asarray(masks, dtype=np.uint32)[None, :]
+    intersection = popcount(user_masks & masks).astype(np.float64)
+    union = popcount(user_masks | masks).astype(np.float64)
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
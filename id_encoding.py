@@ -0,0 +1,71 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Persisted vocabularies: row number in the file is the dense int32 code
+MOVIE_ID_VOCAB_PATH = 'vocab_movie_ids.csv'
+BOOK_USER_VOCAB_PATH = 'vocab_book_user_ids.csv'
+ISBN_VOCAB_PATH = 'vocab_isbns.csv'
+
+# Book-Crossing ISBNs come whitespace-padded (see book_stats.csv); strip them so joins line up
+def normalize_isbn(isbns):
+    return isbns.astype(str).str.strip().str.upper()
+
+# After normalization, ISBNs that differed only in case/padding (e.g. ...x vs ...X) share one key;
+# merge their stats: summed num_ratings and the rating-weighted avg_rating
+def aggregate_book_stats(book_stats):
+    if not book_stats['ISBN'].duplicated().any():
+        return book_stats
+    weighted = book_stats.assign(rating_sum=book_stats['avg_rating'] * book_stats['num_ratings'])
+    merged = weighted.groupby('ISBN', as_index=False, sort=False).agg(
+        rating_sum=('rating_sum', 'sum'), num_ratings=('num_ratings', 'sum')
+    )
+    merged['avg_rating'] = merged['rating_sum'] / merged['num_ratings']
+    return merged[['ISBN', 'avg_rating', 'num_ratings']]
+
+# Sorted unique non-null values of one or more columns
+def build_vocab(*columns):
+    values = pd.concat([pd.Series(col) for col in columns], ignore_index=True).dropna()
+    return pd.Index(np.sort(values.unique()))
+
+def save_vocab(vocab, path):
+    pd.DataFrame({'value': vocab}).to_csv(path, index=False)
+
+def load_vocab(path, dtype=None):
+    vocab_df = pd.read_csv(path, dtype={'value': dtype} if dtype else None)
+    return pd.Index(vocab_df['value'])
+
+# Load a persisted vocabulary and append any unseen values at the end so existing codes stay stable
+def load_or_build_vocab(path, *columns, dtype=None):
+    if not os.path.exists(path):
+        return build_vocab(*columns)
+    vocab = load_vocab(path, dtype=dtype)
+    unseen = build_vocab(*columns).difference(vocab)
+    if len(unseen):
+        vocab = vocab.append(unseen)
+    return vocab
+
+# Map values to their int32 codes; values missing from the vocabulary get -1
+def encode(values, vocab):
+    return vocab.get_indexer(values).astype(np.int32)
+
+# Add a dense movie_idx column to the movie catalog (and optionally its ratings)
+def encode_movie_data(movies_df, ratings_df=None, vocab_path=MOVIE_ID_VOCAB_PATH):
+    movie_vocab = load_or_build_vocab(vocab_path, movies_df['movieId'], dtype='int64')
+    movies_df['movie_idx'] = encode(movies_df['movieId'], movie_vocab)
+    if ratings_df is not None:
+        ratings_df['movie_idx'] = encode(ratings_df['movieId'], movie_vocab)
+    return movies_df, ratings_df, movie_vocab
+
+# Normalize ISBNs and add isbn_idx / user_idx columns to the book frames
+def encode_book_data(books_df, ratings_df, book_stats, user_vocab_path=BOOK_USER_VOCAB_PATH, isbn_vocab_path=ISBN_VOCAB_PATH):
+    for df in (books_df, ratings_df, book_stats):
+        df['ISBN'] = normalize_isbn(df['ISBN'])
+    book_stats = aggregate_book_stats(book_stats)
+    books_df = books_df.drop_duplicates('ISBN').copy()
+    isbn_vocab = load_or_build_vocab(isbn_vocab_path, books_df['ISBN'], ratings_df['ISBN'], book_stats['ISBN'], dtype='str')
+    user_vocab = load_or_build_vocab(user_vocab_path, ratings_df['User-ID'], dtype='int64')
+    for df in (books_df, ratings_df, book_stats):
+        df['isbn_idx'] = encode(df['ISBN'], isbn_vocab)
+    ratings_df['user_idx'] = encode(ratings_df['User-ID'], user_vocab)
+    return books_df, ratings_df, book_stats, user_vocab, isbn_vocab
@@ -0,0 +1,88 @@
+import inspect
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from scipy.sparse import csr_matrix
+
+# Truncated SVD baseline: missing entries are treated as zeros
+def fit_svd(matrix, n_factors=20, random_state=42):
+    from sklearn.decomposition import TruncatedSVD
+    svd = TruncatedSVD(n_components=n_factors, random_state=random_state)
+    user_factors = svd.fit_transform(matrix)
+    item_factors = svd.components_.T
+    return user_factors, item_factors
+
+# Solve (Y_u^T Y_u + reg*I) x_u = Y_u^T r_u for every row of a CSR block at once,
+# using a few conjugate-gradient steps warm-started from the current factors.
+# Only observed entries enter Y_u, so missing ratings are not treated as zeros.
+def _cg_solve_block(block, other_factors, factors, reg, cg_steps):
+    rows = np.repeat(np.arange(block.shape[0]), np.diff(block.indptr))
+    cols = block.indices
+    other = other_factors[cols]
+
+    def matvec(p):
+        pred = np.einsum('ij,ij->i', other, p[rows])
+        return csr_matrix((pred, cols, block.indptr), shape=block.shape) @ other_factors + reg * p
+
+    x = factors.copy()
+    r = block @ other_factors - matvec(x)
+    p = r.copy()
+    rs = np.einsum('ij,ij->i', r, r)
+    for _ in range(cg_steps):
+        active = rs > 1e-10
+        if not active.any():
+            break
+        ap = matvec(p)
+        denom = np.einsum('ij,ij->i', p, ap)
+        alpha = np.where(active, rs / np.where(denom > 0, denom, 1.0), 0.0)
+        x += alpha[:, None] * p
+        r -= alpha[:, None] * ap
+        rs_new = np.einsum('ij,ij->i', r, r)
+        beta = np.where(active, rs_new / np.where(rs > 0, rs, 1.0), 0.0)
+        p = r + beta[:, None] * p
+        rs = rs_new
+    return x
+
+# Update all rows of `factors` block by block, spreading blocks across threads
+# (the heavy NumPy/SciPy kernels release the GIL)
+def _als_half_step(matrix, other_factors, factors, reg, cg_steps, block_size, executor):
+    starts = range(0, matrix.shape[0], block_size)
+    def solve(start):
+        stop = min(start + block_size, matrix.shape[0])
+        factors[start:stop] = _cg_solve_block(matrix[start:stop], other_factors, factors[start:stop], reg, cg_steps)
+    list(executor.map(solve, starts))
+
+# Alternating least squares on the observed ratings only (ratings are mean-centred first)
+def fit_als(matrix, n_factors=20, reg=0.1, iterations=10, cg_steps=3, block_size=2048, n_jobs=None, random_state=42):
+    matrix = csr_matrix(matrix, dtype=np.float64)
+    global_mean = matrix.data.mean() if matrix.nnz else 0.0
+    centred = matrix.copy()
+    centred.data -= global_mean
+    centred_t = centred.T.tocsr()
+    rng = np.random.default_rng(random_state)
+    user_factors = rng.normal(scale=0.01, size=(matrix.shape[0], n_factors))
+    item_factors = rng.normal(scale=0.01, size=(matrix.shape[1], n_factors))
+    n_jobs = n_jobs or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        for _ in range(iterations):
+            _als_half_step(centred, item_factors, user_factors, reg, cg_steps, block_size, executor)
+            _als_half_step(centred_t, user_factors, item_factors, reg, cg_steps, block_size, executor)
+    return user_factors, item_factors
+
+FACTORIZATION_ENGINES = {
+    'svd': fit_svd,
+    'als': fit_als,
+}
+
+def _get_engine(engine):
+    if engine not in FACTORIZATION_ENGINES:
+        raise ValueError(f"Unknown factorization engine '{engine}'. Choose from: {', '.join(FACTORIZATION_ENGINES)}")
+    return FACTORIZATION_ENGINES[engine]
+
+# Whether the named engine takes a given keyword (e.g. n_jobs, which only ALS uses)
+def engine_accepts(engine, name):
+    return name in inspect.signature(_get_engine(engine)).parameters
+
+# Fit the named engine and return (user_factors, item_factors); unknown keywords raise TypeError
+def fit_factors(matrix, engine='svd', **kwargs):
+    return _get_engine(engine)(matrix, **kwargs)
@@ -0,0 +1,106 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from scipy.sparse import csr_matrix
+from matrix_factorization import fit_factors, engine_accepts, FACTORIZATION_ENGINES
+
+# Hold out the last `test_fraction` of each user's ratings as the test set.
+# "Last" is by `time_col` when given (time holdout), otherwise a seeded random order.
+# Users with a single rating stay entirely in the training set.
+def train_test_split_ratings(ratings_df, user_col='user_idx', time_col=None, test_fraction=0.2, seed=42):
+    if time_col is not None:
+        order_key = pd.to_datetime(ratings_df[time_col]).to_numpy()
+    else:
+        order_key = np.random.default_rng(seed).random(len(ratings_df))
+    order = np.lexsort((order_key, ratings_df[user_col].to_numpy()))
+    ordered = ratings_df.iloc[order]
+    position = ordered.groupby(user_col).cumcount().to_numpy()
+    size = ordered.groupby(user_col)[user_col].transform('size').to_numpy()
+    n_train = np.maximum(np.ceil(size * (1 - test_fraction)).astype(int), 1)
+    is_test = position >= n_train
+    return ordered[~is_test], ordered[is_test]
+
+# Build train/test matrices that share one compact row/column index space
+def build_train_test_matrices(train_df, test_df, user_col='user_idx', item_col='isbn_idx', rating_col='Book-Rating'):
+    users = np.concatenate([train_df[user_col].to_numpy(), test_df[user_col].to_numpy()])
+    items = np.concatenate([train_df[item_col].to_numpy(), test_df[item_col].to_numpy()])
+    _, rows = np.unique(users, return_inverse=True)
+    _, cols = np.unique(items, return_inverse=True)
+    shape = (rows.max() + 1, cols.max() + 1)
+    n_train = len(train_df)
+    train = csr_matrix((train_df[rating_col].to_numpy(dtype=np.float32), (rows[:n_train], cols[:n_train])), shape=shape)
+    test = csr_matrix((test_df[rating_col].to_numpy(dtype=np.float32), (rows[n_train:], cols[n_train:])), shape=shape)
+    # Items never seen in training cannot be recommended; drop them from the test set
+    seen_items = train.getnnz(axis=0) > 0
+    test.data[~seen_items[test.indices]] = 0
+    test.eliminate_zeros()
+    return train, test
+
+# precision@k / recall@k / NDCG@k for one block of users
+def _evaluate_block(start, stop, user_factors, item_factors, train, test, k, relevance_threshold):
+    scores = user_factors[start:stop] @ item_factors.T
+    train_block = train[start:stop]
+    scores[np.repeat(np.arange(stop - start), np.diff(train_block.indptr)), train_block.indices] = -np.inf
+    top = np.argpartition(-scores, kth=min(k, scores.shape[1] - 1), axis=1)[:, :k]
+    top = np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1), axis=1)
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    precisions, recalls, ndcgs = [], [], []
+    test_block = test[start:stop]
+    for u in range(stop - start):
+        row = slice(test_block.indptr[u], test_block.indptr[u + 1])
+        relevant = test_block.indices[row][test_block.data[row] >= relevance_threshold]
+        if len(relevant) == 0:
+            continue
+        hits = np.isin(top[u], relevant)
+        precisions.append(hits.sum() / k)
+        recalls.append(hits.sum() / len(relevant))
+        ideal = discounts[:min(len(relevant), k)].sum()
+        ndcgs.append((hits * discounts[:len(hits)]).sum() / ideal)
+    return precisions, recalls, ndcgs
+
+# Fit one engine on `train` and score it on `test`, evaluating user blocks in parallel threads
+def evaluate_engine(engine, train, test, k=10, relevance_threshold=7, block_size=1024, n_jobs=None, **engine_kwargs):
+    # n_jobs also sizes the evaluation pool; only forward it to engines that take it
+    if n_jobs is not None and engine_accepts(engine, 'n_jobs'):
+        engine_kwargs = dict(engine_kwargs, n_jobs=n_jobs)
+    start_time = time.perf_counter()
+    user_factors, item_factors = fit_factors(train, engine=engine, **engine_kwargs)
+    train_seconds = time.perf_counter() - start_time
+    blocks = [(start, min(start + block_size, train.shape[0])) for start in range(0, train.shape[0], block_size)]
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count() or 1) as executor:
+        results = list(executor.map(
+            lambda b: _evaluate_block(b[0], b[1], user_factors, item_factors, train, test, k, relevance_threshold),
+            blocks
+        ))
+    eval_seconds = time.perf_counter() - start_time
+    precisions = [p for block in results for p in block[0]]
+    recalls = [r for block in results for r in block[1]]
+    ndcgs = [g for block in results for g in block[2]]
+    return {
+        'engine': engine,
+        f'precision@{k}': float(np.mean(precisions)) if precisions else 0.0,
+        f'recall@{k}': float(np.mean(recalls)) if recalls else 0.0,
+        f'ndcg@{k}': float(np.mean(ndcgs)) if ndcgs else 0.0,
+        'users_evaluated': len(ndcgs),
+        'train_seconds': train_seconds,
+        'eval_seconds': eval_seconds,
+    }
+
+# Split once and compare several engines on the same holdout
+def compare_engines(ratings_df, engines=tuple(FACTORIZATION_ENGINES), user_col='user_idx', item_col='isbn_idx',
+                    rating_col='Book-Rating', time_col=None, test_fraction=0.2, k=10, relevance_threshold=7, seed=42, **engine_kwargs):
+    train_df, test_df = train_test_split_ratings(ratings_df, user_col=user_col, time_col=time_col, test_fraction=test_fraction, seed=seed)
+    train, test = build_train_test_matrices(train_df, test_df, user_col=user_col, item_col=item_col, rating_col=rating_col)
+    results = [evaluate_engine(engine, train, test, k=k, relevance_threshold=relevance_threshold, **engine_kwargs) for engine in engines]
+    return pd.DataFrame(results)
+
+if __name__ == '__main__':
+    from book_collaborative_filtering import load_book_data, filter_active
+    books_df, ratings_df, book_stats = load_book_data()
+    filtered_ratings = filter_active(ratings_df, min_user_ratings=10, min_book_ratings=10, verbose=True)
+    print(f'Comparing engines on {len(filtered_ratings)} book ratings...')
+    report = compare_engines(filtered_ratings, k=10, n_factors=20)
+    print(report.to_string(index=False))
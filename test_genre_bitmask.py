@@ -0,0 +1,48 @@
+import os
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+sklearn_pairwise = pytest.importorskip('sklearn.metrics.pairwise')
+
+import genre_bitmask
+from genre_bitmask import build_genre_vocab, pack_genres, unpack_genres, popcount, cosine_scores
+
+MOVIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'movies_cleaned.csv')
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    movies_df = pd.read_csv(MOVIES_PATH, usecols=['movieId', 'title', 'genres'], dtype={'genres': 'str'})
+    genre_vocab = build_genre_vocab(movies_df['genres'])
+    masks = pack_genres(movies_df['genres'], genre_vocab)
+    return genre_vocab, masks
+
+
+def test_cosine_scores_match_sklearn_on_one_hot(catalog):
+    genre_vocab, masks = catalog
+    one_hot = unpack_genres(masks, genre_vocab).astype(np.float64)
+    rng = np.random.default_rng(0)
+    # Realistic profiles: mean of the genre rows of some liked movies, plus an empty profile
+    profiles = np.array([one_hot[rng.choice(len(one_hot), size=rng.integers(1, 50))].mean(axis=0) for _ in range(200)])
+    profiles = np.vstack([profiles, np.zeros(len(genre_vocab))])
+    expected = sklearn_pairwise.cosine_similarity(profiles, one_hot)
+    actual = cosine_scores(profiles, masks)
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-12)
+    # The top-5 scores used by recommend_movies must agree. Scores can differ from sklearn by an ulp,
+    # which may reorder exactly tied movies, so compare the sorted values rather than the indices.
+    top_actual = -np.sort(-actual[:-1], axis=1)[:, :5]
+    top_expected = -np.sort(-expected[:-1], axis=1)[:, :5]
+    np.testing.assert_allclose(top_actual, top_expected, rtol=0, atol=1e-12)
+
+
+def test_popcount_dtype_matches_fallback(monkeypatch):
+    masks = np.array([0, 1, 0xFFFFFFFF, 0b1011, 1 << 31], dtype=np.uint32)
+    expected = np.array([0, 1, 32, 3, 1], dtype=np.uint8)
+    result = popcount(masks)
+    assert result.dtype == np.uint8
+    np.testing.assert_array_equal(result, expected)
+    monkeypatch.delattr(genre_bitmask.np, 'bitwise_count', raising=False)
+    fallback = genre_bitmask.popcount(masks)
+    assert fallback.dtype == np.uint8
+    np.testing.assert_array_equal(fallback, expected)
@@ -0,0 +1,25 @@
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from id_encoding import encode_book_data
+
+
+def test_case_twin_isbns_share_one_stats_row(tmp_path):
+    books_df = pd.DataFrame({'ISBN': [' 006099486X', '006099486x', '0330299891'], 'Book-Title': ['A', 'A', 'B']})
+    ratings_df = pd.DataFrame({'User-ID': [1, 2, 3], 'ISBN': ['006099486X', '006099486x', '0330299891'], 'Book-Rating': [8, 2, 6]})
+    book_stats = pd.DataFrame({
+        'ISBN': [' 006099486X', ' 006099486x', ' 0330299891'],
+        'avg_rating': [8.0, 2.0, 6.0],
+        'num_ratings': [54, 2, 1],
+    })
+    books_df, ratings_df, book_stats, _, _ = encode_book_data(
+        books_df, ratings_df, book_stats,
+        user_vocab_path=str(tmp_path / 'users.csv'), isbn_vocab_path=str(tmp_path / 'isbns.csv')
+    )
+    assert not book_stats['isbn_idx'].duplicated().any()
+    assert not books_df['isbn_idx'].duplicated().any()
+    twin = book_stats.set_index('ISBN').loc['006099486X']
+    assert twin['num_ratings'] == 56
+    assert twin['avg_rating'] == pytest.approx((8.0 * 54 + 2.0 * 2) / 56)
+    assert ratings_df['isbn_idx'].nunique() == 2